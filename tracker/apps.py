@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class TrackerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tracker'
+
+    def ready(self):
+        connection_created.connect(configure_sqlite)
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Настраивает SQLite для одновременного чтения и записи занятости."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        # WAL позволяет читателям не блокироваться писателями
+        cursor.execute('PRAGMA journal_mode=WAL;')
+        # В режиме WAL достаточно NORMAL: fsync только на контрольных точках
+        cursor.execute('PRAGMA synchronous=NORMAL;')
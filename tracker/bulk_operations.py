@@ -0,0 +1,81 @@
+import uuid
+from django.db import transaction
+from .models import Workplace
+
+BULK_ACTIONS = ('create', 'confirm', 'delete', 'rename')
+
+
+def _parse_ids(ids):
+    """Приводит список идентификаторов к UUID (ValueError при ошибке)."""
+    if not isinstance(ids, list):
+        raise ValueError("ids должен быть списком")
+    return [uuid.UUID(str(wp_id)) for wp_id in ids]
+
+
+def _parse_items(items):
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ValueError("items должен быть списком объектов")
+    return items
+
+
+def _validate_name(name):
+    max_length = Workplace._meta.get_field('name').max_length
+    if not isinstance(name, str) or not name or len(name) > max_length:
+        raise ValueError(f"Некорректное название: {name!r}")
+    return name
+
+
+def _validate_bbox(bbox):
+    if (not isinstance(bbox, list) or len(bbox) != 4
+            or not all(isinstance(v, int) and not isinstance(v, bool) for v in bbox)):
+        raise ValueError(f"bbox должен быть списком из 4 целых чисел: {bbox!r}")
+    return bbox
+
+
+def apply_bulk_operation(action, data):
+    """Применяет пакетную операцию над рабочими местами в одной транзакции.
+
+    Поддерживаемые действия:
+    - create: data['items'] = [{'name': ..., 'bbox': [x, y, w, h]}, ...]
+    - confirm: data['ids'] = [id, ...]
+    - delete: data['ids'] = [id, ...]
+    - rename: data['items'] = [{'id': ..., 'name': ...}, ...]
+
+    Возвращает словарь с результатом. Входные данные проверяются до начала
+    транзакции; при некорректных данных выбрасывается KeyError или ValueError.
+    """
+    if action not in BULK_ACTIONS:
+        raise ValueError(f"Неизвестное действие: {action}")
+
+    if action == 'create':
+        workplaces = [
+            Workplace(name=_validate_name(item['name']), bbox=_validate_bbox(item['bbox']), is_confirmed=False)
+            for item in _parse_items(data['items'])
+        ]
+    elif action == 'rename':
+        names = {
+            uuid.UUID(str(item['id'])): _validate_name(item['name'])
+            for item in _parse_items(data['items'])
+        }
+    else:
+        ids = _parse_ids(data['ids'])
+
+    with transaction.atomic():
+        if action == 'create':
+            Workplace.objects.bulk_create(workplaces)
+            return {'ids': [str(wp.id) for wp in workplaces]}
+
+        if action == 'confirm':
+            updated = Workplace.objects.filter(id__in=ids).update(is_confirmed=True)
+            return {'updated': updated}
+
+        if action == 'delete':
+            deleted, _ = Workplace.objects.filter(id__in=ids).delete()
+            return {'deleted': deleted}
+
+        # rename: один UPDATE ... CASE без предварительного SELECT. Чтение внутри
+        # отложенной транзакции SQLite мешает повысить ее до записи, если писатель
+        # занятости успел закоммитить между SELECT и UPDATE ("database is locked").
+        workplaces = [Workplace(id=wp_id, name=name) for wp_id, name in names.items()]
+        updated = Workplace.objects.bulk_update(workplaces, ['name'])
+        return {'updated': updated}
@@ -3,8 +3,12 @@ import json
 from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from .video_processing import VideoProcessor
+from django.db import DatabaseError
+from .video_processing import VideoProcessor, VIDEO_CODECS
 from .models import Workplace
+from .bulk_operations import apply_bulk_operation
+
+DEFAULT_KEYFRAME_INTERVAL = 50
 
 class VideoConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -22,6 +26,17 @@ class VideoConsumer(AsyncWebsocketConsumer):
 
         print(f"Источник видео для этого соединения: {self.video_source}")
 
+        self.video_codec = params.get('codec', ['jpeg'])[0]
+        if self.video_codec not in VIDEO_CODECS:
+            self.video_codec = 'jpeg'
+        try:
+            self.keyframe_interval = int(params.get('keyframe_interval', [DEFAULT_KEYFRAME_INTERVAL])[0])
+        except ValueError:
+            self.keyframe_interval = DEFAULT_KEYFRAME_INTERVAL
+        # Верхнюю границу по частоте кадров задает FMP4Encoder
+        self.keyframe_interval = max(1, self.keyframe_interval)
+        self.resync_requested = False
+
         self.workplaces_dict = await self.get_workplaces_from_db()
         self.processor = None
         self.video_task = asyncio.create_task(self.stream_video())
@@ -42,13 +57,16 @@ class VideoConsumer(AsyncWebsocketConsumer):
                     if self.processor and threshold > 0:
                         self.processor.set_stay_threshold(threshold)
                         print(f"Порог времени обновлен: {threshold} сек")
+                elif data['type'] == 'request_keyframe':
+                    # Клиент пересоздал MediaSource: со следующим кадром отправим init-сегмент и последний опорный кадр
+                    self.resync_requested = True
                 elif data['type'] == 'confirm_workplace':
                     wp_id = data['id']
                     await self.confirm_workplace_in_db(wp_id)
                     self.workplaces_dict = await self.get_workplaces_from_db()
                     if self.processor:
                         self.processor.update_workplaces(self.workplaces_dict)
-                    await self.send_workplace_update()  # Уведомляем фронтенд
+                    await self.send_workplace_update(self.workplaces_dict)  # Уведомляем фронтенд
                     print(f"Рабочее место {wp_id} подтверждено и обновлено на видео")
                 elif data['type'] == 'delete_workplace':
                     wp_id = data['id']
@@ -56,17 +74,34 @@ class VideoConsumer(AsyncWebsocketConsumer):
                     self.workplaces_dict = await self.get_workplaces_from_db()
                     if self.processor:
                         self.processor.update_workplaces(self.workplaces_dict)
-                    await self.send_workplace_update()
+                    await self.send_workplace_update(self.workplaces_dict)
                     print(f"Рабочее место {wp_id} удалено и обновлено на видео")
-            except (json.JSONDecodeError, KeyError, ValueError) as e:
+                elif data['type'] == 'bulk_workplaces':
+                    await self.handle_bulk_workplaces(data)
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
                 print(f"Ошибка обработки сообщения: {e}")
 
     async def stream_video(self):
         try:
-            self.processor = VideoProcessor(video_source=self.video_source, initial_workplaces=self.workplaces_dict)
+            self.processor = VideoProcessor(
+                video_source=self.video_source,
+                initial_workplaces=self.workplaces_dict,
+                video_codec=self.video_codec,
+                keyframe_interval=self.keyframe_interval
+            )
+            stream_info_sent = False
             
             async for frame_bytes, proposal in self.async_frame_generator(self.processor):
-                await self.send(bytes_data=frame_bytes)
+                if self.resync_requested and self.processor.encoder and stream_info_sent:
+                    # Кэш уже содержит фрагмент текущего кадра
+                    self.resync_requested = False
+                    await self.send_stream_info()
+                    await self.send(bytes_data=self.processor.encoder.join_segments())
+                elif frame_bytes:
+                    if not stream_info_sent:
+                        await self.send_stream_info()
+                        stream_info_sent = True
+                    await self.send(bytes_data=frame_bytes)
                 
                 if proposal:
                     print(f"Получено предложение о создании рабочего места: {proposal}")
@@ -142,8 +177,39 @@ class VideoConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             print(f"Ошибка удаления рабочего места: {e}")
 
-    async def send_workplace_update(self):
-        workplaces = await self.get_workplaces_from_db()
+    async def handle_bulk_workplaces(self, data):
+        """Выполняет пакетную операцию и сообщает клиенту результат (bulk_result)."""
+        action = data.get('action')
+        try:
+            result = await self.apply_bulk_in_db(action, data)
+        except (KeyError, TypeError, ValueError, DatabaseError) as e:
+            print(f"Ошибка пакетной операции '{action}': {e}")
+            await self.send(text_data=json.dumps({
+                'type': 'bulk_result', 'action': action, 'status': 'error', 'message': str(e)
+            }))
+            return
+        # Одна перезагрузка и одно уведомление на всю пачку
+        self.workplaces_dict = await self.get_workplaces_from_db()
+        if self.processor:
+            self.processor.update_workplaces(self.workplaces_dict)
+        await self.send_workplace_update(self.workplaces_dict)
+        await self.send(text_data=json.dumps({'type': 'bulk_result', 'action': action, 'status': 'ok', **result}))
+        print(f"Пакетная операция '{action}' выполнена: {result}")
+
+    @database_sync_to_async
+    def apply_bulk_in_db(self, action, data):
+        return apply_bulk_operation(action, data)
+
+    async def send_stream_info(self):
+        """Сообщает клиенту формат следующих бинарных сообщений."""
+        info = {'type': 'stream_info', 'codec': self.processor.VIDEO_CODEC}
+        if self.processor.encoder:
+            info['mime'] = self.processor.encoder.mime_type
+        await self.send(text_data=json.dumps(info))
+
+    async def send_workplace_update(self, workplaces=None):
+        if workplaces is None:
+            workplaces = await self.get_workplaces_from_db()
         await self.send(text_data=json.dumps({
             'type': 'workplace_update',
             'workplaces': [
@@ -1,3 +1,271 @@
-from django.test import TestCase
+import json
+import uuid
+from unittest import mock
+from django.db import DatabaseError, OperationalError
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from . import video_encoding
+from .bulk_operations import apply_bulk_operation
+from .consumers import VideoConsumer
+from .models import Workplace
 
-# Create your tests here.
+
+class BulkOperationTests(TestCase):
+    """Тесты пакетных операций над рабочими местами."""
+
+    def setUp(self):
+        self.wp1 = Workplace.objects.create(name='Seat 1', bbox=[0, 0, 10, 10])
+        self.wp2 = Workplace.objects.create(name='Seat 2', bbox=[20, 20, 10, 10])
+
+    def test_create(self):
+        result = apply_bulk_operation('create', {'items': [
+            {'name': 'Seat 3', 'bbox': [40, 40, 10, 10]},
+            {'name': 'Seat 4', 'bbox': [60, 60, 10, 10]},
+        ]})
+        self.assertEqual(len(result['ids']), 2)
+        created = Workplace.objects.filter(id__in=result['ids'])
+        self.assertEqual(sorted(wp.name for wp in created), ['Seat 3', 'Seat 4'])
+        self.assertFalse(any(wp.is_confirmed for wp in created))
+
+    def test_confirm(self):
+        result = apply_bulk_operation('confirm', {'ids': [str(self.wp1.id), str(self.wp2.id)]})
+        self.assertEqual(result, {'updated': 2})
+        self.assertEqual(Workplace.objects.filter(is_confirmed=True).count(), 2)
+
+    def test_delete(self):
+        result = apply_bulk_operation('delete', {'ids': [str(self.wp1.id), str(uuid.uuid4())]})
+        self.assertEqual(result, {'deleted': 1})
+        self.assertFalse(Workplace.objects.filter(id=self.wp1.id).exists())
+        self.assertTrue(Workplace.objects.filter(id=self.wp2.id).exists())
+
+    def test_rename(self):
+        result = apply_bulk_operation('rename', {'items': [
+            {'id': str(self.wp1.id), 'name': 'Desk A'},
+            {'id': str(self.wp2.id), 'name': 'Desk B'},
+        ]})
+        self.assertEqual(result, {'updated': 2})
+        self.wp1.refresh_from_db()
+        self.wp2.refresh_from_db()
+        self.assertEqual((self.wp1.name, self.wp2.name), ('Desk A', 'Desk B'))
+
+    def test_rename_counts_only_existing(self):
+        result = apply_bulk_operation('rename', {'items': [
+            {'id': str(self.wp1.id), 'name': 'Desk A'},
+            {'id': str(uuid.uuid4()), 'name': 'Desk X'},
+        ]})
+        self.assertEqual(result, {'updated': 1})
+        self.assertEqual(Workplace.objects.count(), 2)
+
+    def test_invalid_items_rejected_before_write(self):
+        bad_items = [
+            {'name': 'Seat', 'bbox': [1]},
+            {'name': 'Seat', 'bbox': 'abc'},
+            {'name': 'Seat', 'bbox': [1, 2, 3, 4.5]},
+            {'name': None, 'bbox': [1, 2, 3, 4]},
+            {'name': '', 'bbox': [1, 2, 3, 4]},
+            {'name': 'x' * 101, 'bbox': [1, 2, 3, 4]},
+            {'name': 'Seat', 'bbox': None},
+        ]
+        for item in bad_items:
+            with self.subTest(item=item):
+                with self.assertRaises(ValueError):
+                    apply_bulk_operation('create', {'items': [{'name': 'Ok', 'bbox': [1, 2, 3, 4]}, item]})
+        with self.assertRaises(ValueError):
+            apply_bulk_operation('rename', {'items': [{'id': str(self.wp1.id), 'name': None}]})
+        self.assertEqual(Workplace.objects.count(), 2)
+
+    def test_failure_rolls_back_whole_batch(self):
+        def failing_bulk_update(objs, fields, **kwargs):
+            # Первое место успевает обновиться, затем пакет обрывается
+            Workplace.objects.filter(id=objs[0].id).update(name=objs[0].name)
+            raise DatabaseError('сбой посреди пакета')
+
+        with mock.patch.object(Workplace.objects, 'bulk_update', side_effect=failing_bulk_update):
+            with self.assertRaises(DatabaseError):
+                apply_bulk_operation('rename', {'items': [
+                    {'id': str(self.wp1.id), 'name': 'Desk A'},
+                    {'id': str(self.wp2.id), 'name': 'Desk B'},
+                ]})
+        self.assertEqual(
+            sorted(Workplace.objects.values_list('name', flat=True)),
+            ['Seat 1', 'Seat 2'],
+        )
+
+
+class WorkplaceBulkApiTests(TestCase):
+    """Тесты POST /api/workplaces/bulk/."""
+
+    def setUp(self):
+        self.url = reverse('workplace-bulk-api')
+        self.wp = Workplace.objects.create(name='Seat 1', bbox=[0, 0, 10, 10])
+
+    def post(self, data):
+        return self.client.post(self.url, data=json.dumps(data), content_type='application/json')
+
+    def test_confirm(self):
+        response = self.post({'action': 'confirm', 'ids': [str(self.wp.id)]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok', 'updated': 1})
+        self.wp.refresh_from_db()
+        self.assertTrue(self.wp.is_confirmed)
+
+    def test_create_returns_ids(self):
+        response = self.post({'action': 'create', 'items': [{'name': 'Seat 2', 'bbox': [5, 5, 10, 10]}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Workplace.objects.filter(id=response.json()['ids'][0]).exists())
+
+    def test_bad_ids(self):
+        response = self.post({'action': 'delete', 'ids': ['not-a-uuid']})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Workplace.objects.filter(id=self.wp.id).exists())
+
+    def test_unknown_action(self):
+        response = self.post({'action': 'explode', 'ids': [str(self.wp.id)]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_bbox(self):
+        response = self.post({'action': 'create', 'items': [{'name': 'Seat 2', 'bbox': [1]}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Workplace.objects.count(), 1)
+
+    def test_invalid_method(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 405)
+
+
+class BulkWorkplacesConsumerTests(SimpleTestCase):
+    """Тесты WebSocket-сообщения bulk_workplaces."""
+
+    def make_consumer(self):
+        consumer = VideoConsumer()
+        consumer.processor = None
+        consumer.send = mock.AsyncMock()
+        return consumer
+
+    async def test_database_error_reported_to_client(self):
+        consumer = self.make_consumer()
+        message = {'type': 'bulk_workplaces', 'action': 'confirm', 'ids': [str(uuid.uuid4())]}
+        with mock.patch('tracker.consumers.apply_bulk_operation', side_effect=OperationalError('database is locked')):
+            await consumer.receive(text_data=json.dumps(message))
+        consumer.send.assert_awaited_once()
+        response = json.loads(consumer.send.await_args.kwargs['text_data'])
+        self.assertEqual(response['type'], 'bulk_result')
+        self.assertEqual(response['status'], 'error')
+        self.assertIn('database is locked', response['message'])
+
+    async def test_invalid_data_reported_to_client(self):
+        consumer = self.make_consumer()
+        await consumer.receive(text_data=json.dumps({'type': 'bulk_workplaces', 'action': 'explode', 'ids': []}))
+        response = json.loads(consumer.send.await_args.kwargs['text_data'])
+        self.assertEqual((response['type'], response['status']), ('bulk_result', 'error'))
+
+
+def _box(box_type, body):
+    return (8 + len(body)).to_bytes(4, 'big') + box_type + body
+
+
+def _full_box(box_type, flags, payload):
+    return _box(box_type, b'\x00' + flags.to_bytes(3, 'big') + payload)
+
+
+def _u32(*values):
+    return b''.join(v.to_bytes(4, 'big') for v in values)
+
+
+KEY_FLAGS = 0x02000000  # sample_depends_on=2, sync
+NON_KEY_FLAGS = 0x01010000  # sample_depends_on=1, non-sync
+
+
+def _moof(tfhd, trun):
+    return _box(b'moof', _full_box(b'mfhd', 0, _u32(1)) + _box(b'traf', tfhd + trun))
+
+
+def _first_sample_flags_moof(sample_flags):
+    tfhd = _full_box(b'tfhd', 0, _u32(1))
+    # data_offset + first_sample_flags
+    trun = _full_box(b'trun', 0x005, _u32(1, 0, sample_flags))
+    return _moof(tfhd, trun)
+
+
+def _per_sample_flags_moof(sample_flags):
+    tfhd = _full_box(b'tfhd', 0, _u32(1))
+    # data_offset + duration + size + flags для каждого сэмпла
+    trun = _full_box(b'trun', 0x701, _u32(2, 0, 40, 100, sample_flags, 40, 100, NON_KEY_FLAGS))
+    return _moof(tfhd, trun)
+
+
+def _default_flags_moof(sample_flags):
+    # base_data_offset (8 байт) + default_sample_flags
+    tfhd = _full_box(b'tfhd', 0x21, _u32(1) + (0).to_bytes(8, 'big') + _u32(sample_flags))
+    trun = _full_box(b'trun', 0x201, _u32(1, 0, 100))
+    return _moof(tfhd, trun)
+
+
+class FragmentParsingTests(SimpleTestCase):
+    """Тесты разбора фрагментированного MP4; PyAV не требуется."""
+
+    def make_encoder(self):
+        with mock.patch.object(video_encoding, 'av', object()):
+            return video_encoding.FMP4Encoder(fps=25, keyframe_interval=50)
+
+    def test_keyframe_detection(self):
+        builders = {
+            'first_sample_flags': _first_sample_flags_moof,
+            'per_sample_flags': _per_sample_flags_moof,
+            'default_flags': _default_flags_moof,
+        }
+        for name, build in builders.items():
+            with self.subTest(path=name):
+                self.assertTrue(video_encoding._is_keyframe_fragment(build(KEY_FLAGS)))
+                self.assertFalse(video_encoding._is_keyframe_fragment(build(NON_KEY_FLAGS)))
+
+    def test_fragment_without_flags_is_not_keyframe(self):
+        moof = _moof(_full_box(b'tfhd', 0, _u32(1)), _full_box(b'trun', 0x001, _u32(1, 0)))
+        self.assertFalse(video_encoding._is_keyframe_fragment(moof))
+
+    def test_iter_boxes_largesize_and_truncated(self):
+        large = (1).to_bytes(4, 'big') + b'mdat' + (20).to_bytes(8, 'big') + b'abcd'
+        data = large + _box(b'free', b'') + _box(b'mdat', b'xyz')[:-1]
+        boxes = list(video_encoding._iter_boxes(data))
+        self.assertEqual([(t, s, b, e) for t, s, b, e in boxes], [(b'mdat', 0, 16, 20), (b'free', 20, 28, 28)])
+
+    def test_drain_extracts_init_segment_and_codec_string(self):
+        encoder = self.make_encoder()
+        init = _box(b'ftyp', b'isom') + _box(b'moov', _box(b'avcC', bytes([1, 0x42, 0xC0, 0x1F])))
+        encoder._sink.write(init)
+        self.assertEqual(encoder._drain(), init)
+        self.assertEqual(encoder.init_segment, init)
+        self.assertEqual(encoder.codec_string, 'avc1.42C01F')
+        self.assertEqual(encoder.mime_type, 'video/mp4; codecs="avc1.42C01F"')
+
+    def test_drain_keeps_truncated_fragment(self):
+        encoder = self.make_encoder()
+        key = _first_sample_flags_moof(KEY_FLAGS) + _box(b'mdat', b'key')
+        delta_moof = _first_sample_flags_moof(NON_KEY_FLAGS)
+        delta_mdat = _box(b'mdat', b'delta')
+        encoder._sink.write(key + delta_moof + delta_mdat[:6])
+
+        self.assertEqual(encoder._drain(), key)
+        self.assertEqual(bytes(encoder._sink.data), delta_moof + delta_mdat[:6])
+        self.assertEqual(encoder.gop_segments, [key])
+
+        encoder._sink.write(delta_mdat[6:])
+        self.assertEqual(encoder._drain(), delta_moof + delta_mdat)
+        self.assertEqual(bytes(encoder._sink.data), b'')
+        self.assertEqual(encoder.gop_segments, [key, delta_moof + delta_mdat])
+
+    def test_keyframe_resets_gop_cache(self):
+        encoder = self.make_encoder()
+        encoder.init_segment = b'init'
+        first = _first_sample_flags_moof(KEY_FLAGS) + _box(b'mdat', b'1')
+        delta = _first_sample_flags_moof(NON_KEY_FLAGS) + _box(b'mdat', b'2')
+        second = _default_flags_moof(KEY_FLAGS) + _box(b'mdat', b'3')
+        encoder._sink.write(first + delta + second)
+        encoder._drain()
+        self.assertEqual(encoder.gop_segments, [second])
+        self.assertEqual(encoder.join_segments(), b'init' + second)
+
+    def test_keyframe_interval_is_clamped(self):
+        with mock.patch.object(video_encoding, 'av', object()):
+            self.assertEqual(video_encoding.FMP4Encoder(fps=25, keyframe_interval=1000000).keyframe_interval, 250)
+            self.assertEqual(video_encoding.FMP4Encoder(fps=25, keyframe_interval=0).keyframe_interval, 1)
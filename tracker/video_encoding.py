@@ -0,0 +1,197 @@
+import time
+from fractions import Fraction
+
+try:
+    import av
+except ImportError:  # PyAV необязателен: без него доступен только JPEG
+    av = None
+
+# Флаги muxer'а: пустой moov в начале и отдельный фрагмент (moof+mdat) на каждый кадр
+FMP4_MOVFLAGS = 'empty_moov+default_base_moof+frag_every_frame'
+INIT_BOX_TYPES = (b'ftyp', b'moov')
+# Бит sample_is_non_sync_sample в sample_flags (ISO/IEC 14496-12)
+SAMPLE_NON_SYNC_FLAG = 0x00010000
+# Верхняя граница интервала опорных кадров: кэш GOP хранится в памяти и целиком отправляется при ресинхронизации
+MAX_KEYFRAME_INTERVAL_SECONDS = 10
+
+
+class _ByteSink:
+    """Несмещаемый (non-seekable) приемник байтов для muxer'а PyAV."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+
+def _iter_boxes(data):
+    """Разбирает последовательность MP4-боксов: (тип, начало бокса, начало тела, конец)."""
+    offset = 0
+    while offset + 8 <= len(data):
+        size = int.from_bytes(data[offset:offset + 4], 'big')
+        box_type = bytes(data[offset + 4:offset + 8])
+        header = 8
+        if size == 1:
+            if offset + 16 > len(data):
+                return
+            size = int.from_bytes(data[offset + 8:offset + 16], 'big')
+            header = 16
+        if size < header or offset + size > len(data):
+            return
+        yield box_type, offset, offset + header, offset + size
+        offset += size
+
+
+def _is_keyframe_fragment(moof):
+    """Проверяет, начинается ли фрагмент (moof) с опорного кадра."""
+    for box_type, _, start, end in _iter_boxes(moof[8:]):
+        if box_type != b'traf':
+            continue
+        traf = moof[8 + start:8 + end]
+        default_flags = None
+        for child_type, _, c_start, c_end in _iter_boxes(traf):
+            body = traf[c_start:c_end]
+            tr_flags = int.from_bytes(body[1:4], 'big')
+            if child_type == b'tfhd':
+                pos = 8  # version/flags + track_ID
+                for flag, width in ((0x01, 8), (0x02, 4), (0x08, 4), (0x10, 4)):
+                    if tr_flags & flag:
+                        pos += width
+                if tr_flags & 0x20:
+                    default_flags = int.from_bytes(body[pos:pos + 4], 'big')
+            elif child_type == b'trun':
+                pos = 8  # version/flags + sample_count
+                if tr_flags & 0x01:
+                    pos += 4
+                if tr_flags & 0x04:
+                    sample_flags = int.from_bytes(body[pos:pos + 4], 'big')
+                elif tr_flags & 0x400:
+                    pos += 4 * bool(tr_flags & 0x100) + 4 * bool(tr_flags & 0x200)
+                    sample_flags = int.from_bytes(body[pos:pos + 4], 'big')
+                else:
+                    sample_flags = default_flags
+                if sample_flags is None:
+                    return False
+                return not sample_flags & SAMPLE_NON_SYNC_FLAG
+    return False
+
+
+class FMP4Encoder:
+    """Кодирует кадры OpenCV в H.264 и упаковывает их во фрагментированный MP4 для MSE."""
+
+    def __init__(self, fps=25, keyframe_interval=50, bitrate=None):
+        if av is None:
+            raise RuntimeError("Для H.264 требуется PyAV (pip install av)")
+        self.fps = fps
+        max_interval = max(1, round(fps * MAX_KEYFRAME_INTERVAL_SECONDS))
+        self.keyframe_interval = min(max(1, int(keyframe_interval)), max_interval)
+        self.bitrate = bitrate
+        self.container = None
+        self.stream = None
+        self.start_time = None
+        self.last_pts = -1
+        self._sink = _ByteSink()
+        self.init_segment = b''
+        self.codec_string = None
+        self.gop_segments = []  # фрагменты начиная с последнего опорного кадра
+
+    @staticmethod
+    def is_available():
+        return av is not None
+
+    @property
+    def mime_type(self):
+        return f'video/mp4; codecs="{self.codec_string}"'
+
+    def _open(self, width, height):
+        self.container = av.open(self._sink, mode='w', format='mp4', options={'movflags': FMP4_MOVFLAGS})
+        self.stream = self.container.add_stream('libx264', rate=round(self.fps))
+        self.stream.width = width
+        self.stream.height = height
+        self.stream.pix_fmt = 'yuv420p'
+        # Метки времени берем по часам: YOLO обрабатывает кадры с переменной частотой
+        self.stream.codec_context.time_base = Fraction(1, 1000)
+        if self.bitrate:
+            self.stream.codec_context.bit_rate = self.bitrate
+        n = self.keyframe_interval
+        self.stream.codec_context.options = {
+            'preset': 'veryfast',
+            'tune': 'zerolatency',  # без B-кадров и lookahead
+            'profile': 'baseline',
+            'x264-params': f'keyint={n}:min-keyint={n}:scenecut=0',
+        }
+        self.start_time = time.time()
+
+    def encode(self, frame):
+        """Кодирует кадр BGR и возвращает готовые к отправке байты (может быть b'')."""
+        height, width = frame.shape[:2]
+        # yuv420p требует четных размеров
+        frame = frame[:height - height % 2, :width - width % 2]
+        if self.container is None:
+            self._open(frame.shape[1], frame.shape[0])
+
+        pts = max(int((time.time() - self.start_time) * 1000), self.last_pts + 1)
+        self.last_pts = pts
+        video_frame = av.VideoFrame.from_ndarray(frame, format='bgr24')
+        video_frame.pts = pts
+        video_frame.time_base = Fraction(1, 1000)
+        for packet in self.stream.encode(video_frame):
+            self.container.mux(packet)
+        return self._drain()
+
+    def _drain(self):
+        """Забирает из буфера завершенные боксы и обновляет кэш для новых клиентов."""
+        data = self._sink.data
+        output = bytearray()
+        consumed = 0
+        moof = None
+        for box_type, box_start, _, end in _iter_boxes(data):
+            box = bytes(data[box_start:end])
+            if moof is not None:
+                if box_type != b'mdat':
+                    moof += box
+                    continue
+                fragment = moof + box
+                moof = None
+                if _is_keyframe_fragment(fragment):
+                    self.gop_segments = []
+                self.gop_segments.append(fragment)
+                output += fragment
+            elif box_type == b'moof':
+                moof = box
+                continue
+            else:
+                if box_type in INIT_BOX_TYPES:
+                    self.init_segment += box
+                    if box_type == b'moov':
+                        self._parse_codec_string()
+                output += box
+            consumed = end
+        # Незавершенный фрагмент (moof без mdat) остается в буфере до следующего вызова
+        del data[:consumed]
+        return bytes(output)
+
+    def _parse_codec_string(self):
+        pos = self.init_segment.find(b'avcC')
+        if pos != -1 and pos + 8 <= len(self.init_segment):
+            profile, compat, level = self.init_segment[pos + 5:pos + 8]
+            self.codec_string = f'avc1.{profile:02X}{compat:02X}{level:02X}'
+        else:
+            self.codec_string = 'avc1.42E01F'
+
+    def join_segments(self):
+        """Init-сегмент и фрагменты с последнего опорного кадра — для нового или пересоздавшего MediaSource клиента."""
+        return self.init_segment + b''.join(self.gop_segments)
+
+    def close(self):
+        if self.container is None:
+            return
+        try:
+            for packet in self.stream.encode(None):
+                self.container.mux(packet)
+            self.container.close()
+        except Exception as e:
+            print(f"Ошибка закрытия кодировщика H.264: {e}")
+        self.container = None
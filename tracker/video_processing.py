@@ -5,9 +5,12 @@ import uuid
 from collections import defaultdict
 from ultralytics import YOLO
 from deep_sort_realtime.deepsort_tracker import DeepSort
+from .video_encoding import FMP4Encoder
+
+VIDEO_CODECS = ('jpeg', 'h264')
 
 class VideoProcessor:
-    def __init__(self, video_source=0, initial_workplaces=None):
+    def __init__(self, video_source=0, initial_workplaces=None, video_codec='jpeg', keyframe_interval=50):
         YOLO_MODEL_PATH = 'yolo11l.pt'
         self.CONFIDENCE_THRESHOLD = 0.4
         self.VIDEO_SOURCE = video_source
@@ -16,6 +19,18 @@ class VideoProcessor:
         self.MAX_DISTANCE_FOR_STAY_PX = 30
         self.WORKPLACE_SIZE_PX = 75
         self.PREVIEW_DURATION_SECONDS = 5
+        self.KEYFRAME_INTERVAL = keyframe_interval
+        self.STATS_INTERVAL_SECONDS = 10
+
+        if video_codec not in VIDEO_CODECS:
+            print(f"!!! Неизвестный кодек {video_codec}. Используется JPEG.")
+            video_codec = 'jpeg'
+        if video_codec == 'h264' and not FMP4Encoder.is_available():
+            print("!!! PyAV не установлен, H.264 недоступен. Используется JPEG.")
+            video_codec = 'jpeg'
+        self.VIDEO_CODEC = video_codec
+        self.encoder = None
+        self.encoding_stats = {'frames': 0, 'bytes': 0, 'encode_time': 0.0, 'start': time.time()}
 
         try:
             self.model_yolo = YOLO(YOLO_MODEL_PATH)
@@ -189,28 +204,62 @@ class VideoProcessor:
             print(f"!!! Ошибка: не удалось открыть источник видео {self.VIDEO_SOURCE}")
             return
 
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                print("Конец видео или ошибка чтения. Перезапуск...")
-                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                continue
-            
-            results = self.model_yolo(frame, verbose=False, classes=[0])
-            
-            detections_for_deepsort = [
-                ([int(b[0]), int(b[1]), int(b[2]-b[0]), int(b[3]-b[1])], float(conf), "person")
-                for r in results for b, conf in zip(r.boxes.xyxy, r.boxes.conf) if float(conf) > self.CONFIDENCE_THRESHOLD
-            ]
-            
-            tracks = self.deepsort_tracker.update_tracks(detections_for_deepsort, frame=frame)
-            
-            proposal = self._analyze_tracks_and_draw(frame, tracks)
+        if self.VIDEO_CODEC == 'h264':
+            fps = cap.get(cv2.CAP_PROP_FPS) or 25
+            self.encoder = FMP4Encoder(fps=fps, keyframe_interval=self.KEYFRAME_INTERVAL)
 
-            ret, buffer = cv2.imencode('.jpg', frame)
-            if not ret:
-                continue
-            
-            yield (buffer.tobytes(), proposal)
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    print("Конец видео или ошибка чтения. Перезапуск...")
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                
+                results = self.model_yolo(frame, verbose=False, classes=[0])
+                
+                detections_for_deepsort = [
+                    ([int(b[0]), int(b[1]), int(b[2]-b[0]), int(b[3]-b[1])], float(conf), "person")
+                    for r in results for b, conf in zip(r.boxes.xyxy, r.boxes.conf) if float(conf) > self.CONFIDENCE_THRESHOLD
+                ]
+                
+                tracks = self.deepsort_tracker.update_tracks(detections_for_deepsort, frame=frame)
+                
+                proposal = self._analyze_tracks_and_draw(frame, tracks)
 
-        cap.release()
\ No newline at end of file
+                encode_start = time.perf_counter()
+                frame_bytes = self._encode_frame(frame)
+                if frame_bytes is None:
+                    continue
+                self._update_encoding_stats(len(frame_bytes), time.perf_counter() - encode_start)
+                
+                # Для H.264 frame_bytes может быть пустым, пока muxer не завершил фрагмент
+                yield (frame_bytes, proposal)
+        finally:
+            cap.release()
+            if self.encoder:
+                self.encoder.close()
+
+    def _encode_frame(self, frame):
+        """Кодирует кадр выбранным кодеком. Возвращает None при ошибке JPEG."""
+        if self.encoder:
+            return self.encoder.encode(frame)
+        ret, buffer = cv2.imencode('.jpg', frame)
+        if not ret:
+            return None
+        return buffer.tobytes()
+
+    def _update_encoding_stats(self, num_bytes, encode_time):
+        """Накапливает и периодически выводит битрейт и время кодирования для сравнения JPEG и H.264."""
+        stats = self.encoding_stats
+        stats['frames'] += 1
+        stats['bytes'] += num_bytes
+        stats['encode_time'] += encode_time
+        elapsed = time.time() - stats['start']
+        if elapsed < self.STATS_INTERVAL_SECONDS:
+            return
+        mbps = stats['bytes'] * 8 / elapsed / 1_000_000
+        fps = stats['frames'] / elapsed
+        encode_ms = stats['encode_time'] / stats['frames'] * 1000
+        print(f"Кодек {self.VIDEO_CODEC}: {mbps:.2f} Мбит/с, {fps:.1f} кадр/с, кодирование {encode_ms:.1f} мс/кадр")
+        self.encoding_stats = {'frames': 0, 'bytes': 0, 'encode_time': 0.0, 'start': time.time()}
\ No newline at end of file
@@ -3,6 +3,7 @@ from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
 from .models import Workplace
+from .bulk_operations import apply_bulk_operation
 
 def index(request):
     """Рендерит главную страницу."""
@@ -29,6 +30,19 @@ def workplace_api(request):
     
     return JsonResponse({'error': 'Invalid method'}, status=405)
 
+@csrf_exempt
+def workplace_bulk_api(request):
+    """API для пакетного создания, подтверждения, удаления и переименования рабочих мест."""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            result = apply_bulk_operation(data['action'], data)
+            return JsonResponse({'status': 'ok', **result}, status=200)
+        except (KeyError, TypeError, ValueError):
+            return JsonResponse({'error': 'Invalid data'}, status=400)
+
+    return JsonResponse({'error': 'Invalid method'}, status=405)
+
 @csrf_exempt
 def workplace_detail_api(request, pk):
     """API для удаления конкретного рабочего места."""
@@ -64,8 +64,15 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Постоянные соединения: не переподключаемся на каждый вызов database_sync_to_async
+        'CONN_MAX_AGE': None,
+        'OPTIONS': {
+            # Ждем освобождения блокировки вместо немедленной ошибки "database is locked"
+            'timeout': 20,
+        },
     }
 }
+# PRAGMA (WAL и др.) применяются при открытии соединения, см. tracker/apps.py
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [